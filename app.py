@@ -1,133 +1,383 @@
-import streamlit as st
-import networkx as nx
-import matplotlib.pyplot as plt
-import pandas as pd
-import io
-import base64
-
-# --- Page Config ---
-st.set_page_config(page_title="FCM Tool", layout="wide")
-
-# --- Header ---
-st.markdown("""
-<h1 style='text-align: center;'>Adaptive Leadership: Navigating Complexity & Change</h1>
-<h3 style='text-align: center; color: gray;'>Fuzzy Cognitive Mapping Tool</h3>
-<hr>
-""", unsafe_allow_html=True)
-
-# --- Scenario Selector ---
-with st.expander("💡 Or start with a pre-built scenario"):
-    scenario = st.selectbox("Choose a scenario to explore:", ["None", "Navigating Impostor Syndrome", "Managing Up, Down, and Sideways", "Transitioning from Contributor to Manager"])
-    preset_nodes, preset_edges = [], []
-    if scenario == "Navigating Impostor Syndrome":
-        preset_nodes = [
-            "Impostor feelings", "Peer comparison", "Perfectionism", "Confidence", "Feedback seeking",
-            "Mentoring support", "Reframing failure", "Participation in class", "Experimentation", "Belonging"
-        ]
-        preset_edges = [
-            ("Peer comparison", "Impostor feelings", 1.0),
-            ("Perfectionism", "Impostor feelings", 0.6),
-            ("Impostor feelings", "Confidence", -1.0),
-            ("Confidence", "Participation in class", 0.8),
-            ("Confidence", "Experimentation", 0.6),
-            ("Mentoring support", "Confidence", 0.6),
-            ("Reframing failure", "Confidence", 0.6),
-            ("Feedback seeking", "Confidence", 0.4),
-            ("Belonging", "Confidence", 0.5),
-            ("Participation in class", "Belonging", 0.5),
-        ]
-    elif scenario == "Managing Up, Down, and Sideways":
-        preset_nodes = [
-            "Clarity of goals", "Trust with supervisor", "Team cohesion", "Lateral communication",
-            "Influence skills", "Conflicting priorities", "Feedback loops", "Strategic alignment",
-            "Reputation", "Psychological safety"
-        ]
-        preset_edges = [
-            ("Clarity of goals", "Strategic alignment", 0.8),
-            ("Trust with supervisor", "Feedback loops", 0.6),
-            ("Lateral communication", "Team cohesion", 0.7),
-            ("Team cohesion", "Psychological safety", 0.8),
-            ("Feedback loops", "Reputation", 0.6),
-            ("Influence skills", "Trust with supervisor", 0.5),
-            ("Conflicting priorities", "Strategic alignment", -0.7),
-            ("Strategic alignment", "Reputation", 0.7),
-        ]
-    elif scenario == "Transitioning from Contributor to Manager":
-        preset_nodes = [
-            "Desire to stay hands-on", "Delegation skills", "Trust in team", "Micromanagement",
-            "Clarity of role", "Team development", "Communication skills", "Manager identity",
-            "Peer support", "Feedback seeking", "Strategic thinking", "Time management",
-            "Imposter syndrome", "Perceived effectiveness", "Team performance"
-        ]
-        preset_edges = [
-            ("Desire to stay hands-on", "Micromanagement", 0.7),
-            ("Micromanagement", "Trust in team", -0.8),
-            ("Delegation skills", "Trust in team", 0.6),
-            ("Trust in team", "Team performance", 0.7),
-            ("Team performance", "Perceived effectiveness", 0.8),
-            ("Perceived effectiveness", "Manager identity", 0.6),
-            ("Feedback seeking", "Manager identity", 0.5),
-            ("Imposter syndrome", "Feedback seeking", -0.5),
-            ("Strategic thinking", "Clarity of role", 0.7),
-            ("Clarity of role", "Manager identity", 0.6),
-            ("Manager identity", "Delegation skills", 0.7),
-            ("Time management", "Micromanagement", -0.5),
-            ("Communication skills", "Trust in team", 0.6),
-        ]
-
-# --- Intro Primer ---
-st.subheader("What is a Fuzzy Cognitive Map (FCM)?")
-st.markdown("""
-Fuzzy Cognitive Maps (FCMs) are visual tools that help you model how different concepts influence each other in a complex system. 
-They’re especially useful when:
-- The relationships are uncertain or subjective
-- You're thinking about change over time
-- You want to simulate how changes in one area might affect others
-
-In this tool, you'll define a mental landscape, organize concepts into categories, link them, and simulate how they interact.
-""")
-
-# Use preset nodes and edges if scenario selected, otherwise allow manual input (in the next development steps)
-if preset_nodes:
-    st.subheader("Scenario Concepts")
-    st.markdown("These are the core concepts defined in the selected scenario:")
-    for node in preset_nodes:
-        st.markdown(f"- {node}")
-
-    st.subheader("Visualizing the Scenario")
-    G = nx.DiGraph()
-    G.add_nodes_from(preset_nodes)
-    G.add_weighted_edges_from(preset_edges)
-
-    fig, ax = plt.subplots(figsize=(12, 10))
-    pos = nx.spring_layout(G, k=0.5, seed=42)
-    nx.draw_networkx_nodes(G, pos, node_size=2000, node_color="lightblue", alpha=0.8)
-    nx.draw_networkx_labels(G, pos, font_size=9, font_weight="bold")
-    nx.draw_networkx_edges(G, pos, edge_color="gray", arrows=True, width=2, alpha=0.5)
-    nx.draw_networkx_edge_labels(G, pos, edge_labels={(i, j): f"{w:.1f}" for i, j, w in preset_edges}, font_size=8)
-    plt.title("Fuzzy Cognitive Map", fontsize=16)
-    plt.axis("off")
-    st.pyplot(fig)
-
-    st.subheader("🧠 Identify Leverage Points")
-    out_strength = G.out_degree(weight='weight')
-    out_strength_dict = dict(out_strength)
-    most_influential = sorted(out_strength_dict, key=lambda x: out_strength_dict[x], reverse=True)[0]
-    st.markdown(f"**Most influential concept:** `{most_influential}`")
-
-    options = [n for n in preset_nodes if n != most_influential]
-    target_node = st.selectbox("Which concept do you want to adjust its influence on?", options)
-    new_weight = st.slider("Adjust influence strength:", -1.0, 1.0, 0.5, step=0.1)
-
-    st.markdown("---")
-    st.markdown("### 🌀 Ripple Effect Analysis")
-    st.markdown(f"You increased/decreased `{most_influential}`'s impact on `{target_node}` to `{new_weight}`.")
-    st.markdown("This change would affect not just the target concept but also other concepts **downstream** through the system. Depending on feedback loops and connectivity, it may amplify or dampen other areas.")
-    st.markdown("Students should explore questions like:")
-    st.markdown("- How direct is the impact of this change?")
-    st.markdown("- What other concepts are indirectly influenced?")
-    st.markdown("- Does this adjustment create more clarity or unintended friction?")
-
-    st.success("Use this analysis to experiment with leverage and complexity. The goal is to uncover where small shifts yield systemic improvement.")
-else:
-    st.info("Select a scenario or build your own FCM (feature coming soon)")
+# Heavy libraries (networkx, matplotlib, pandas) are imported lazily at
+# their use sites so sessions that have not built a map yet skip their
+# import cost on every cold start.
+import heapq
+
+import streamlit as st
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def propagate(W, v0, damping, steps):
+    """Run the FCM update for up to `steps` iterations and return the final state.
+
+    Fuses the influence sum, damping update, and [0, 1] clamp into one
+    compiled loop; lives at module top level so it JITs once per process,
+    not on every Streamlit rerun. Exits early once the state stops
+    changing — saturated maps often settle in two or three steps.
+    """
+    N = v0.shape[0]
+    out = v0.copy()
+    for _ in range(steps):
+        new = out.copy()
+        delta = 0.0
+        for i in range(N):
+            s = 0.0
+            for j in range(N):
+                s += W[i, j] * out[j]
+            x = out[i] + damping * s
+            new[i] = 0.0 if x < 0.0 else (1.0 if x > 1.0 else x)
+            d = new[i] - out[i]
+            if d < 0.0:
+                d = -d
+            if d > delta:
+                delta = d
+        out = new
+        if delta < 1e-6:
+            break
+    return out
+
+
+# Warm the JIT specialization on a trivial map at import, so the first real
+# simulation of a fresh process does not stall on compilation (cache=True
+# makes this a fast on-disk cache load after the very first run ever).
+propagate(np.zeros((2, 2), dtype=np.float32), np.full(2, 0.5, dtype=np.float32), 0.5, 1)
+
+
+# Preset scenarios, frozen at import time: (concepts, weighted edges).
+SCENARIOS = {
+    "Navigating Impostor Syndrome": (
+        (
+            "Impostor feelings", "Peer comparison", "Perfectionism", "Confidence", "Feedback seeking",
+            "Mentoring support", "Reframing failure", "Participation in class", "Experimentation", "Belonging",
+        ),
+        (
+            ("Peer comparison", "Impostor feelings", 1.0),
+            ("Perfectionism", "Impostor feelings", 0.6),
+            ("Impostor feelings", "Confidence", -1.0),
+            ("Confidence", "Participation in class", 0.8),
+            ("Confidence", "Experimentation", 0.6),
+            ("Mentoring support", "Confidence", 0.6),
+            ("Reframing failure", "Confidence", 0.6),
+            ("Feedback seeking", "Confidence", 0.4),
+            ("Belonging", "Confidence", 0.5),
+            ("Participation in class", "Belonging", 0.5),
+        ),
+    ),
+    "Managing Up, Down, and Sideways": (
+        (
+            "Clarity of goals", "Trust with supervisor", "Team cohesion", "Lateral communication",
+            "Influence skills", "Conflicting priorities", "Feedback loops", "Strategic alignment",
+            "Reputation", "Psychological safety",
+        ),
+        (
+            ("Clarity of goals", "Strategic alignment", 0.8),
+            ("Trust with supervisor", "Feedback loops", 0.6),
+            ("Lateral communication", "Team cohesion", 0.7),
+            ("Team cohesion", "Psychological safety", 0.8),
+            ("Feedback loops", "Reputation", 0.6),
+            ("Influence skills", "Trust with supervisor", 0.5),
+            ("Conflicting priorities", "Strategic alignment", -0.7),
+            ("Strategic alignment", "Reputation", 0.7),
+        ),
+    ),
+    "Transitioning from Contributor to Manager": (
+        (
+            "Desire to stay hands-on", "Delegation skills", "Trust in team", "Micromanagement",
+            "Clarity of role", "Team development", "Communication skills", "Manager identity",
+            "Peer support", "Feedback seeking", "Strategic thinking", "Time management",
+            "Imposter syndrome", "Perceived effectiveness", "Team performance",
+        ),
+        (
+            ("Desire to stay hands-on", "Micromanagement", 0.7),
+            ("Micromanagement", "Trust in team", -0.8),
+            ("Delegation skills", "Trust in team", 0.6),
+            ("Trust in team", "Team performance", 0.7),
+            ("Team performance", "Perceived effectiveness", 0.8),
+            ("Perceived effectiveness", "Manager identity", 0.6),
+            ("Feedback seeking", "Manager identity", 0.5),
+            ("Imposter syndrome", "Feedback seeking", -0.5),
+            ("Strategic thinking", "Clarity of role", 0.7),
+            ("Clarity of role", "Manager identity", 0.6),
+            ("Manager identity", "Delegation skills", 0.7),
+            ("Time management", "Micromanagement", -0.5),
+            ("Communication skills", "Trust in team", 0.6),
+        ),
+    ),
+}
+
+
+# Qualitative rating scale: labels index straight into the weight array,
+# so label grids convert to a weight matrix with one fancy-index operation.
+INFLUENCE_LABELS = ["None", "Low (+)", "Moderate (+)", "High (+)", "Low (–)", "Moderate (–)", "High (–)"]
+INFLUENCE_WEIGHTS = np.array([0.0, 0.3, 0.6, 1.0, -0.3, -0.6, -1.0], dtype=np.float32)
+LABEL_INDEX = {lab: i for i, lab in enumerate(INFLUENCE_LABELS)}
+
+
+@st.cache_data
+def parse_nodes(text):
+    """Split a concepts text block into a tuple of unique non-empty stripped lines.
+
+    Order-preserving dedupe: repeated concepts would make the weight
+    matrix's index/columns non-unique and crash the data_editor.
+    """
+    return tuple(dict.fromkeys(n.strip() for n in text.split("\n") if n.strip()))
+
+
+@st.cache_data
+def run_simulation(nodes_tuple, edges_tuple, damping, steps):
+    """Memoized propagation keyed on the exact map and parameters.
+
+    The leverage rerun differs from the baseline by a single edge, so both
+    results stay cached across reruns that only touch unrelated widgets.
+    """
+    N = len(nodes_tuple)
+    idx = {n: i for i, n in enumerate(nodes_tuple)}
+    # float32 halves memory traffic on the propagation kernel with no
+    # visible precision loss at the 0.1-step weight scale.
+    W = np.zeros((N, N), dtype=np.float32)
+    for s, t, w in edges_tuple:
+        W[idx[t], idx[s]] = w
+    v0 = np.full(N, 0.5, dtype=np.float32)
+    return propagate(W, v0, damping, steps)
+
+
+@st.cache_data
+def compute_layout(nodes_tuple, pairs_tuple, seed=42, k=0.5):
+    """Memoized spring layout keyed on topology alone.
+
+    Takes (source, target) pairs without weights: adjusting an existing
+    influence strength keeps the cached positions, only adding or removing
+    a connection moves nodes around.
+    """
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes_tuple)
+    G.add_edges_from(pairs_tuple)
+    return nx.spring_layout(G, seed=seed, k=k)
+
+
+@st.cache_data
+def render_png(nodes_tuple, edges_tuple):
+    """Draw the map and rasterize it once per distinct node/edge set."""
+    import io
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes_tuple)
+    G.add_weighted_edges_from(edges_tuple)
+    pos = compute_layout(nodes_tuple, tuple((s, t) for s, t, _ in edges_tuple))
+
+    fig, ax = plt.subplots(figsize=(12, 8), dpi=80)
+    nx.draw_networkx_nodes(G, pos, node_size=2000, node_color="lightblue", alpha=0.8)
+    nx.draw_networkx_labels(G, pos, font_size=9, font_weight="bold")
+    nx.draw_networkx_edges(G, pos, edge_color="gray", arrows=True, width=2, alpha=0.5)
+    if len(edges_tuple) <= 60:
+        # Edge-label text extents are the slowest part of drawing; on dense
+        # maps the labels are unreadable anyway, so skip them.
+        nx.draw_networkx_edge_labels(G, pos, edge_labels={(i, j): f"{w:.1f}" for i, j, w in edges_tuple}, font_size=8)
+    plt.title("Fuzzy Cognitive Map", fontsize=16)
+    plt.axis("off")
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=80, bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+@st.cache_data
+def export_tables(nodes_tuple, values_tuple, edges_tuple):
+    """Serialize the final-value and edge CSVs once per distinct result."""
+    import pandas as pd
+
+    # Prealigned columns keep pandas on the fast array path instead of
+    # row-by-row tuple inference.
+    df_nodes = pd.DataFrame({"Final Value": np.asarray(values_tuple)}, index=pd.Index(nodes_tuple, name="Concept"))
+    df_edges = pd.DataFrame(list(edges_tuple), columns=["Source", "Target", "Weight"])
+    return df_nodes.to_csv().encode(), df_edges.to_csv(index=False).encode()
+
+
+def select_scenario():
+    """Scenario picker; returns (nodes, edges) for the chosen preset, or empty lists."""
+    with st.expander("💡 Or start with a pre-built scenario"):
+        scenario = st.selectbox("Choose a scenario to explore:", ["None"] + list(SCENARIOS))
+    if scenario in SCENARIOS:
+        preset_nodes, preset_edges = SCENARIOS[scenario]
+        return list(preset_nodes), list(preset_edges)
+    return [], []
+
+
+def render_scenario_flow(node_list):
+    """List the preset concepts for the selected scenario."""
+    st.subheader("Scenario Concepts")
+    st.markdown("These are the core concepts defined in the selected scenario:")
+    for node in node_list:
+        st.markdown(f"- {node}")
+
+
+def render_manual_flow():
+    """Build-your-own flow; returns (node_list, edges) from user input."""
+    st.subheader("🛠️ Build Your Own Map")
+    concepts_text = st.text_area("Enter your concepts (one per line):", height=150)
+    node_list = list(parse_nodes(concepts_text))
+    edges = []
+    if len(node_list) >= 2:
+        import pandas as pd
+
+        rating_mode = st.radio("How do you want to rate influences?", ["Numeric weights", "Qualitative labels"], horizontal=True)
+        st.markdown("Fill in the influence matrix: each cell describes the **row** concept's influence on the **column** concept. Leave cells at their default for no influence.")
+        # One data_editor instead of N*(N-1) individual inputs: a single
+        # widget round-trip per edit instead of an O(N^2) widget tree. The
+        # form defers the rerun (simulation, layout, render) until the user
+        # submits, instead of firing on every cell edit.
+        with st.form("edges_form"):
+            if rating_mode == "Qualitative labels":
+                empty = pd.DataFrame("None", index=node_list, columns=node_list)
+                edited = st.data_editor(
+                    empty, key="edge_matrix_labels", num_rows="fixed",
+                    column_config={c: st.column_config.SelectboxColumn(options=INFLUENCE_LABELS) for c in node_list},
+                )
+            else:
+                empty = pd.DataFrame(np.zeros((len(node_list), len(node_list)), dtype=np.float32), index=node_list, columns=node_list)
+                edited = st.data_editor(
+                    empty, key="edge_matrix", num_rows="fixed",
+                    column_config={c: st.column_config.NumberColumn(min_value=-1.0, max_value=1.0, step=0.1, required=True) for c in node_list},
+                )
+            st.form_submit_button("Update simulation")
+        if rating_mode == "Qualitative labels":
+            # Labels -> weights in one fancy-index pass over the whole grid.
+            label_idx = edited.apply(lambda col: col.map(LABEL_INDEX)).fillna(0).to_numpy(dtype=int)
+            weight_grid = INFLUENCE_WEIGHTS[label_idx]
+        else:
+            # Cleared cells come back as None; treat them as 0 like the
+            # qualitative path's fillna does.
+            weight_grid = np.nan_to_num(edited.to_numpy(dtype=np.float32))
+        edges = [
+            (s, t, float(weight_grid[i, j]))
+            for i, s in enumerate(node_list) for j, t in enumerate(node_list)
+            if i != j and weight_grid[i, j] != 0.0
+        ]
+    elif node_list:
+        st.info("Enter at least two concepts to start linking them.")
+    return node_list, edges
+
+
+def render_analysis(node_list, edges):
+    """Visualization, simulation, and leverage analysis shared by both flows."""
+    import pandas as pd
+
+    st.subheader("Visualizing the Map")
+    # Rasterize once per map: the same cached PNG bytes back both the
+    # display and the download.
+    png_bytes = render_png(tuple(node_list), tuple(sorted(edges)))
+    st.image(png_bytes)
+    st.download_button("Download Graph as PNG", data=png_bytes, file_name="fcm_graph.png", mime="image/png")
+
+    st.subheader("⚙️ Simulating the System")
+    st.markdown("Each concept starts at a neutral activation of 0.5. On every step, each concept is nudged by its incoming influences, scaled by the damping factor, and kept within [0, 1].")
+    steps = st.slider("Number of simulation steps:", 1, 10, 5)
+    damping = st.slider("Damping factor:", 0.1, 1.0, 0.5, step=0.1)
+
+    v = run_simulation(tuple(node_list), tuple(sorted(edges)), damping, steps)
+
+    st.dataframe(pd.DataFrame({"Concept": node_list, "Final Value": v.round(3)}))
+
+    csv_nodes, csv_edges = export_tables(tuple(node_list), tuple(v.round(3)), tuple(sorted(edges)))
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download Final Values (CSV)", csv_nodes, "fcm_nodes.csv", "text/csv")
+    with col2:
+        st.download_button("Download Edges (CSV)", csv_edges, "fcm_edges.csv", "text/csv")
+
+    st.subheader("🧠 Identify Leverage Points")
+    # Weighted out-degree straight from the edge list; no graph object needed.
+    out_strength_dict = {n: 0.0 for n in node_list}
+    for s, _, w in edges:
+        out_strength_dict[s] += w
+    # nlargest scans the strengths once instead of fully sorting them.
+    top_influencers = heapq.nlargest(5, out_strength_dict.items(), key=lambda kv: kv[1])
+    most_influential = top_influencers[0][0]
+    st.markdown(f"**Most influential concept:** `{most_influential}`")
+    for node, strength in top_influencers:
+        st.write(f"🔹 {node}: total outgoing influence {strength:+.1f}")
+
+    options = [n for n in node_list if n != most_influential]
+    target_node = st.selectbox("Which concept do you want to adjust its influence on?", options)
+    new_weight = st.slider("Adjust influence strength:", -1.0, 1.0, 0.5, step=0.1)
+
+    st.markdown("---")
+    st.markdown("### 🌀 Ripple Effect Analysis")
+    st.markdown(f"You increased/decreased `{most_influential}`'s impact on `{target_node}` to `{new_weight}`.")
+
+    # Re-simulate with the single adjusted edge; the cache key differs from
+    # the baseline by exactly one edge tuple.
+    mod_weights = {(s, t): w for s, t, w in edges}
+    mod_weights[(most_influential, target_node)] = new_weight
+    mod_edges = tuple(sorted((s, t, w) for (s, t), w in mod_weights.items()))
+    v_mod = run_simulation(tuple(node_list), mod_edges, damping, steps)
+
+    comparison_df = pd.DataFrame({
+        "Concept": node_list,
+        "Original": v.round(3),
+        "Modified": v_mod.round(3),
+    })
+    comparison_df["Change"] = comparison_df["Modified"] - comparison_df["Original"]
+
+    def color_change(col):
+        # Styler.apply gets the whole column at once; np.where builds the
+        # CSS strings in a single vectorized pass.
+        return np.where(col > 0, "background-color: #d1e7dd", np.where(col < 0, "background-color: #f8d7da", ""))
+
+    st.dataframe(comparison_df.style.apply(color_change, subset=["Change"]).format({"Original": "{:.3f}", "Modified": "{:.3f}", "Change": "{:+.3f}"}))
+
+    st.markdown("This change affects not just the target concept but also other concepts **downstream** through the system. Depending on feedback loops and connectivity, it may amplify or dampen other areas.")
+    st.markdown("Students should explore questions like:")
+    st.markdown("- How direct is the impact of this change?")
+    st.markdown("- What other concepts are indirectly influenced?")
+    st.markdown("- Does this adjustment create more clarity or unintended friction?")
+
+    st.success("Use this analysis to experiment with leverage and complexity. The goal is to uncover where small shifts yield systemic improvement.")
+
+
+# --- Page Config ---
+st.set_page_config(page_title="FCM Tool", layout="wide")
+
+# --- Header ---
+st.markdown("""
+<h1 style='text-align: center;'>Adaptive Leadership: Navigating Complexity & Change</h1>
+<h3 style='text-align: center; color: gray;'>Fuzzy Cognitive Mapping Tool</h3>
+<hr>
+""", unsafe_allow_html=True)
+
+# --- Scenario Selector ---
+preset_nodes, preset_edges = select_scenario()
+
+# --- Intro Primer ---
+st.subheader("What is a Fuzzy Cognitive Map (FCM)?")
+st.markdown("""
+Fuzzy Cognitive Maps (FCMs) are visual tools that help you model how different concepts influence each other in a complex system. 
+They’re especially useful when:
+- The relationships are uncertain or subjective
+- You're thinking about change over time
+- You want to simulate how changes in one area might affect others
+
+In this tool, you'll define a mental landscape, organize concepts into categories, link them, and simulate how they interact.
+""")
+
+# Use preset nodes and edges if a scenario is selected, otherwise let the user build their own map
+if preset_nodes:
+    node_list, edges = preset_nodes, preset_edges
+    render_scenario_flow(node_list)
+else:
+    node_list, edges = render_manual_flow()
+
+if node_list and edges:
+    render_analysis(node_list, edges)
+elif not node_list:
+    st.info("Select a scenario above or start listing your own concepts.")